@@ -8,15 +8,41 @@ Usage:
 """
 
 import argparse
-import json
-import subprocess
+import asyncio
+import re
 from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime
 from dataclasses import dataclass
 
+import dns.asyncresolver
+import dns.resolver
+import orjson
+
+try:
+    from execution.dns_cache import cached_resolve
+except ImportError:  # Run as a script: python execution/check_deliverability.py
+    from dns_cache import cached_resolve
+
 # Configuration
 OUTPUT_DIR = Path(__file__).parent.parent / ".tmp" / "deliverability"
+DNS_TIMEOUT = 2
+DNS_LIFETIME = 4
+# Each query is sent to the system resolver and all of these in parallel;
+# the first answer wins
+RESOLVERS = ["1.1.1.1", "8.8.8.8", "9.9.9.9"]
+
+# TXT records are matched as raw bytes, straight from rdata.strings
+_SPF_ALL = re.compile(rb"[~\-]all")
+_DKIM_KEY = re.compile(rb"v=DKIM1|p=")
+_DMARC_P = re.compile(rb"\bp=(reject|quarantine|none)\b")
+
+BLACKLIST_ZONES = [
+    "zen.spamhaus.org",
+    "b.barracudacentral.org",
+    "bl.spamcop.net",
+    "dnsbl.sorbs.net",
+]
 
 
 @dataclass
@@ -30,74 +56,125 @@ class DeliverabilityScore:
     blacklist: float
 
 
+def _join_txt(rdatas) -> List[bytes]:
+    """Join the character-strings of each TXT rdata into one value."""
+    return [b"".join(rdata.strings) for rdata in rdatas]
+
+
+def _resolver_key(resolvers: List[dns.asyncresolver.Resolver]) -> tuple:
+    """Identify a resolver set by its nameservers, shared across checkers."""
+    return tuple(tuple(str(ns) for ns in resolver.nameservers) for resolver in resolvers)
+
+
 class DeliverabilityChecker:
     """Check email deliverability for a domain."""
 
-    def __init__(self, domain: str):
+    def __init__(self, domain: str, ips: Optional[List[str]] = None):
         self.domain = domain
+        self.ips = ips  # Sending IPs for blacklist checks
         self.results = {}
+        self.resolvers = []
+        # The local resolver still works where port 53 to public ones is blocked
+        try:
+            self.system_resolver = dns.asyncresolver.Resolver()
+            self.resolvers.append(self.system_resolver)
+        except dns.resolver.NoResolverConfiguration:
+            self.system_resolver = None
+        for ip in RESOLVERS:
+            resolver = dns.asyncresolver.Resolver(configure=False)
+            resolver.nameservers = [ip]
+            self.resolvers.append(resolver)
+        for resolver in self.resolvers:
+            resolver.timeout = DNS_TIMEOUT
+            resolver.lifetime = DNS_LIFETIME
+
+    async def _resolve(self, name: str, rtype: str, **kwargs) -> dns.resolver.Answer:
+        """Resolve a query, reusing answers cached by earlier audits."""
+        return await cached_resolve(
+            name, rtype, self._query_all, _resolver_key(self.resolvers), **kwargs
+        )
+
+    async def _query_all(self, name: str, rtype: str, **kwargs) -> dns.resolver.Answer:
+        """Query every resolver in parallel and return the first answer.
+
+        NXDOMAIN and NoAnswer are authoritative, so they are raised as soon
+        as any resolver reports them. Other failures (timeouts, SERVFAIL)
+        only propagate once every resolver has failed.
+        """
+        tasks = [
+            asyncio.ensure_future(resolver.resolve(name, rtype, **kwargs))
+            for resolver in self.resolvers
+        ]
+        error = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    return await next_done
+                except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                    raise
+                except Exception as e:
+                    error = e
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _txt_records(self, name: str) -> List[bytes]:
+        """Resolve TXT records for name, joining multi-string records."""
+        try:
+            answer = await self._resolve(name, "TXT")
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return []
+        return _join_txt(answer)
 
-    def check_spf(self) -> Dict:
+    async def check_spf(self) -> Dict:
         """Check SPF record."""
         try:
-            result = subprocess.run(
-                ["dig", "+short", "TXT", self.domain],
-                capture_output=True, text=True, timeout=10
-            )
-            output = result.stdout
+            records = await self._txt_records(self.domain)
+            spf = next((r for r in records if r.startswith(b"v=spf1")), None)
 
-            has_spf = "v=spf1" in output
-            valid = has_spf and ("~all" in output or "-all" in output)
+            has_spf = spf is not None
+            valid = has_spf and _SPF_ALL.search(spf) is not None
 
             return {
                 "exists": has_spf,
                 "valid": valid,
-                "record": output.strip() if has_spf else None,
+                "record": spf.decode(errors="replace") if has_spf else None,
                 "score": 1.0 if valid else (0.5 if has_spf else 0.0),
             }
         except Exception as e:
             return {"exists": False, "valid": False, "error": str(e), "score": 0.0}
 
-    def check_dkim(self, selector: str = "google") -> Dict:
+    async def check_dkim(self, selector: str = "google") -> Dict:
         """Check DKIM record."""
         try:
             dkim_domain = f"{selector}._domainkey.{self.domain}"
-            result = subprocess.run(
-                ["dig", "+short", "TXT", dkim_domain],
-                capture_output=True, text=True, timeout=10
-            )
-            output = result.stdout.strip()
+            records = await self._txt_records(dkim_domain)
+            dkim = next((r for r in records if _DKIM_KEY.search(r)), None)
 
-            has_dkim = "v=DKIM1" in output or "p=" in output
+            has_dkim = dkim is not None
 
             return {
                 "exists": has_dkim,
                 "selector": selector,
-                "record": output if has_dkim else None,
+                "record": dkim.decode(errors="replace") if has_dkim else None,
                 "score": 1.0 if has_dkim else 0.0,
             }
         except Exception as e:
             return {"exists": False, "error": str(e), "score": 0.0}
 
-    def check_dmarc(self) -> Dict:
+    async def check_dmarc(self) -> Dict:
         """Check DMARC record."""
         try:
             dmarc_domain = f"_dmarc.{self.domain}"
-            result = subprocess.run(
-                ["dig", "+short", "TXT", dmarc_domain],
-                capture_output=True, text=True, timeout=10
-            )
-            output = result.stdout.strip()
+            records = await self._txt_records(dmarc_domain)
+            dmarc = next((r for r in records if r.startswith(b"v=DMARC1")), None)
 
-            has_dmarc = "v=DMARC1" in output
+            has_dmarc = dmarc is not None
             policy = None
             if has_dmarc:
-                if "p=reject" in output:
-                    policy = "reject"
-                elif "p=quarantine" in output:
-                    policy = "quarantine"
-                elif "p=none" in output:
-                    policy = "none"
+                match = _DMARC_P.search(dmarc)
+                policy = match.group(1).decode() if match else None
 
             score = 0.0
             if policy == "reject":
@@ -110,22 +187,20 @@ class DeliverabilityChecker:
             return {
                 "exists": has_dmarc,
                 "policy": policy,
-                "record": output if has_dmarc else None,
+                "record": dmarc.decode(errors="replace") if has_dmarc else None,
                 "score": score,
             }
         except Exception as e:
             return {"exists": False, "error": str(e), "score": 0.0}
 
-    def check_mx(self) -> Dict:
+    async def check_mx(self) -> Dict:
         """Check MX records."""
         try:
-            result = subprocess.run(
-                ["dig", "+short", "MX", self.domain],
-                capture_output=True, text=True, timeout=10
-            )
-            output = result.stdout.strip()
-
-            records = [line.strip() for line in output.split("\n") if line.strip()]
+            try:
+                answer = await self._resolve(self.domain, "MX")
+                records = [rdata.to_text() for rdata in answer]
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                records = []
 
             return {
                 "exists": len(records) > 0,
@@ -136,33 +211,73 @@ class DeliverabilityChecker:
         except Exception as e:
             return {"exists": False, "error": str(e), "score": 0.0}
 
-    def check_blacklists(self) -> Dict:
-        """Check common blacklists."""
-        # TODO: Implement actual blacklist checking via APIs
-        blacklists = [
-            "zen.spamhaus.org",
-            "b.barracudacentral.org",
-            "bl.spamcop.net",
-            "dnsbl.sorbs.net",
-        ]
-
-        listed_on = []
-        # Placeholder - actual implementation would query each DNSBL
+    async def _check_dnsbl(self, ip: str, zone: str) -> bool:
+        """Check whether an IPv4 address is listed on a DNSBL zone."""
+        query = ".".join(reversed(ip.split("."))) + "." + zone
+        try:
+            # DNSBLs refuse queries relayed by public resolvers, so use the local one
+            answer = await cached_resolve(
+                query, "A", self.system_resolver.resolve, _resolver_key([self.system_resolver])
+            )
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return False
+
+        addresses = [rdata.address for rdata in answer]
+        # 127.255.255.x are error codes (e.g. Spamhaus refusing the query)
+        if any(address.startswith("127.255.255.") for address in addresses):
+            raise RuntimeError(f"{zone} refused the query ({', '.join(addresses)})")
+        return any(address.startswith("127.") for address in addresses)
+
+    async def check_blacklists(self) -> Dict:
+        """Check the sending IPs against common blacklists."""
+        ips = [ip for ip in self.ips or [] if ":" not in ip]  # IPv4 only
+        if not ips:
+            error = "No sending IPs given" if not self.ips else "No IPv4 sending IPs given"
+            return {
+                "checked": 0, "ips": [], "listed_on": [], "clean": False,
+                "error": error, "score": 0.0,
+            }
+        if self.system_resolver is None:
+            return {
+                "checked": 0, "ips": ips, "listed_on": [], "clean": False,
+                "error": "No system resolver configured for DNSBL lookups", "score": 0.0,
+            }
 
-        return {
-            "checked": len(blacklists),
+        # Every (ip, zone) lookup runs concurrently
+        pairs = [(ip, zone) for ip in ips for zone in BLACKLIST_ZONES]
+        hits = await asyncio.gather(
+            *(self._check_dnsbl(ip, zone) for ip, zone in pairs),
+            return_exceptions=True,
+        )
+        failed = sorted({
+            f"{ip} on {zone}: {hit}"
+            for (ip, zone), hit in zip(pairs, hits) if isinstance(hit, Exception)
+        })
+        listed_on = sorted({zone for (_, zone), hit in zip(pairs, hits) if hit is True})
+        checked = len(pairs) - len(failed)
+
+        result = {
+            "checked": checked,
+            "ips": ips,
             "listed_on": listed_on,
-            "clean": len(listed_on) == 0,
-            "score": 1.0 if len(listed_on) == 0 else max(0.0, 1.0 - len(listed_on) * 0.25),
+            # Only clean if every lookup actually answered
+            "clean": not listed_on and not failed,
+            "score": 0.0 if not checked else max(0.0, 1.0 - len(listed_on) * 0.25),
         }
+        if failed:
+            result["error"] = f"{len(failed)} of {len(pairs)} DNSBL lookups failed"
+            result["failed"] = failed
+        return result
 
     def quick_check(self) -> float:
         """Run quick deliverability check."""
-        spf = self.check_spf()
-        dkim = self.check_dkim()
-        dmarc = self.check_dmarc()
-        mx = self.check_mx()
+        spf, dkim, dmarc, mx = asyncio.run(self._run_checks())
+        return self._score_checks(spf, dkim, dmarc, mx, datetime.now())
 
+    def _score_checks(
+        self, spf: Dict, dkim: Dict, dmarc: Dict, mx: Dict, checked_at: datetime
+    ) -> float:
+        """Store the record check results and return their weighted score."""
         # Calculate weighted score
         weights = {"spf": 0.25, "dkim": 0.25, "dmarc": 0.25, "mx": 0.25}
 
@@ -180,41 +295,61 @@ class DeliverabilityChecker:
             "dkim": dkim,
             "dmarc": dmarc,
             "mx": mx,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": checked_at.isoformat(),
         }
 
         return score
 
+    async def _run_checks(self, blacklists: bool = False) -> list:
+        """Run the SPF/DKIM/DMARC/MX (and blacklist) lookups concurrently."""
+        checks = [
+            self.check_spf(),
+            self.check_dkim(),
+            self.check_dmarc(),
+            self.check_mx(),
+        ]
+        if blacklists:
+            checks.append(self.check_blacklists())
+        return await asyncio.gather(*checks)
+
     def full_audit(self) -> Dict:
         """Run full deliverability audit."""
-        self.quick_check()
-        self.results["blacklists"] = self.check_blacklists()
-
-        # Recalculate with blacklist
-        weights = {"spf": 0.2, "dkim": 0.2, "dmarc": 0.2, "mx": 0.2, "blacklists": 0.2}
-
-        score = (
-            self.results["spf"]["score"] * weights["spf"] +
-            self.results["dkim"]["score"] * weights["dkim"] +
-            self.results["dmarc"]["score"] * weights["dmarc"] +
-            self.results["mx"]["score"] * weights["mx"] +
-            self.results["blacklists"]["score"] * weights["blacklists"]
-        ) * 100
-
-        self.results["score"] = round(score, 1)
+        checked_at = datetime.now()
+        spf, dkim, dmarc, mx, blacklists = asyncio.run(self._run_checks(blacklists=True))
+        self._score_checks(spf, dkim, dmarc, mx, checked_at)
+        self.results["blacklists"] = blacklists
+
+        # Recalculate with blacklist. If no lookup ran (e.g. no sending IPs),
+        # keep the score over the other checks; "error" says why.
+        if blacklists["checked"]:
+            weights = {"spf": 0.2, "dkim": 0.2, "dmarc": 0.2, "mx": 0.2, "blacklists": 0.2}
+
+            score = (
+                self.results["spf"]["score"] * weights["spf"] +
+                self.results["dkim"]["score"] * weights["dkim"] +
+                self.results["dmarc"]["score"] * weights["dmarc"] +
+                self.results["mx"]["score"] * weights["mx"] +
+                self.results["blacklists"]["score"] * weights["blacklists"]
+            ) * 100
+
+            self.results["score"] = round(score, 1)
 
         # Save results
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        output_file = OUTPUT_DIR / f"{self.domain}_{datetime.now().strftime('%Y%m%d')}.json"
-        with open(output_file, "w") as f:
-            json.dump(self.results, f, indent=2)
+        output_file = OUTPUT_DIR / f"{self.domain}_{checked_at.strftime('%Y%m%d')}.json"
+        output_file.write_bytes(orjson.dumps(self.results, option=orjson.OPT_INDENT_2))
 
         return self.results
 
 
-def full_audit(domain: str, test_email: str = None, depth: str = "standard") -> Dict:
-    """Run deliverability audit."""
-    checker = DeliverabilityChecker(domain)
+def full_audit(
+    domain: str,
+    test_email: str = None,
+    depth: str = "standard",
+    ips: Optional[List[str]] = None,
+) -> Dict:
+    """Run deliverability audit (blacklists are checked for the given sending IPs)."""
+    checker = DeliverabilityChecker(domain, ips=ips)
 
     if depth == "quick":
         checker.quick_check()
@@ -229,10 +364,11 @@ def main():
     parser.add_argument("--domain", required=True, help="Domain to check")
     parser.add_argument("--quick", action="store_true", help="Quick check only")
     parser.add_argument("--report", action="store_true", help="Generate report")
+    parser.add_argument("--ip", action="append", help="Sending IP for blacklist checks (repeatable)")
 
     args = parser.parse_args()
 
-    checker = DeliverabilityChecker(args.domain)
+    checker = DeliverabilityChecker(args.domain, ips=args.ip)
 
     if args.quick:
         score = checker.quick_check()
@@ -247,7 +383,13 @@ def main():
         print(f"  DKIM:      {'✓' if results['dkim']['exists'] else '✗'} ({results['dkim']['score']*100:.0f}%)")
         print(f"  DMARC:     {'✓' if results['dmarc']['exists'] else '✗'} ({results['dmarc']['score']*100:.0f}%)")
         print(f"  MX:        {'✓' if results['mx']['exists'] else '✗'} ({results['mx']['score']*100:.0f}%)")
-        print(f"  Blacklist: {'Clean' if results['blacklists']['clean'] else 'LISTED'}")
+        blacklists = results["blacklists"]
+        if blacklists["listed_on"]:
+            print(f"  Blacklist: LISTED ({', '.join(blacklists['listed_on'])})")
+        elif blacklists["clean"]:
+            print("  Blacklist: Clean")
+        else:
+            print(f"  Blacklist: Not checked ({blacklists['error']})")
 
 
 if __name__ == "__main__":
@@ -8,42 +8,88 @@ Usage:
 """
 
 import argparse
+import asyncio
 import json
 import secrets
 import string
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime
 
+import aiohttp
+import aiosmtplib
+
 # Configuration
 GOOGLE_CONFIG = Path(__file__).parent.parent / "config" / "google_workspace.json"
 MICROSOFT_CONFIG = Path(__file__).parent.parent / "config" / "microsoft.json"
 OUTPUT_DIR = Path(__file__).parent.parent / ".tmp" / "mailboxes"
+BULK_CONCURRENCY = 16  # Max mailboxes created in parallel from a CSV
+SMTP_TEST_CONCURRENCY = 20  # Max SMTP logins tested in parallel
+BULK_COLUMNS = ("domain", "first_name", "last_name")  # Required CSV columns
+
+SMTP_SERVERS = {
+    "google": ("smtp.gmail.com", 587),
+    "microsoft": ("smtp.office365.com", 587),
+}
+
+PASSWORD_SYMBOLS = "!@#$%"
+PASSWORD_ALPHABET = string.ascii_letters + string.digits + PASSWORD_SYMBOLS
+# Random bytes at or above this are dropped so "byte % len" stays unbiased
+_PASSWORD_BYTE_LIMIT = 256 - 256 % len(PASSWORD_ALPHABET)
+
+
+@lru_cache(maxsize=4)
+def _load_provider_config(provider: str) -> Dict:
+    """Load provider API credentials (read once per process)."""
+    config_path = GOOGLE_CONFIG if provider == "google" else MICROSOFT_CONFIG
+    if not config_path.exists():
+        raise FileNotFoundError(f"Config not found: {config_path}")
+    return json.loads(config_path.read_bytes())
 
 
 def generate_password(length: int = 16) -> str:
-    """Generate a secure random password."""
-    chars = string.ascii_letters + string.digits + "!@#$%"
-    return ''.join(secrets.choice(chars) for _ in range(length))
+    """Generate a secure random password with at least one digit and symbol."""
+    size = len(PASSWORD_ALPHABET)
+    chars: List[str] = []
+    while len(chars) < length:
+        # One entropy read per batch instead of one per character
+        chars.extend(
+            PASSWORD_ALPHABET[b % size]
+            for b in secrets.token_bytes(2 * length)
+            if b < _PASSWORD_BYTE_LIMIT
+        )
+    del chars[length:]
 
+    if length >= 2:
+        digit_pos, symbol_pos = secrets.SystemRandom().sample(range(length), 2)
+        chars[digit_pos] = secrets.choice(string.digits)
+        chars[symbol_pos] = secrets.choice(PASSWORD_SYMBOLS)
 
-def create_email_address(first: str, last: str, domain: str, pattern: str = "first.last") -> str:
-    """Generate email address based on pattern."""
-    patterns = {
-        "first.last": f"{first.lower()}.{last.lower()}@{domain}",
-        "f.last": f"{first[0].lower()}.{last.lower()}@{domain}",
-        "first": f"{first.lower()}@{domain}",
-        "firstl": f"{first.lower()}{last[0].lower()}@{domain}",
-    }
-    return patterns.get(pattern, patterns["first.last"])
+    return "".join(chars)
 
 
-def create_google_mailbox(
+def create_email_address(first: str, last: str, domain: str, pattern: str = "first.last") -> str:
+    """Generate email address based on pattern."""
+    first = first.lower()
+    last = last.lower()
+    if pattern == "f.last":
+        return f"{first[0]}.{last}@{domain}"
+    if pattern == "first":
+        return f"{first}@{domain}"
+    if pattern == "firstl":
+        return f"{first}{last[0]}@{domain}"
+    return f"{first}.{last}@{domain}"  # "first.last" and unknown patterns
+
+
+async def create_google_mailbox(
     email: str,
     first_name: str,
     last_name: str,
     password: str,
     config: Dict,
+    session: aiohttp.ClientSession,
+    created_at: str,
 ) -> Dict:
     """Create mailbox via Google Workspace Admin API."""
     # TODO: Implement Google Admin SDK call
@@ -53,16 +99,18 @@ def create_google_mailbox(
         "email": email,
         "provider": "google",
         "status": "success",
-        "created_at": datetime.now().isoformat(),
+        "created_at": created_at,
     }
 
 
-def create_microsoft_mailbox(
+async def create_microsoft_mailbox(
     email: str,
     first_name: str,
     last_name: str,
     password: str,
     config: Dict,
+    session: aiohttp.ClientSession,
+    created_at: str,
 ) -> Dict:
     """Create mailbox via Microsoft Graph API."""
     # TODO: Implement Microsoft Graph API call
@@ -72,38 +120,47 @@ def create_microsoft_mailbox(
         "email": email,
         "provider": "microsoft",
         "status": "success",
-        "created_at": datetime.now().isoformat(),
+        "created_at": created_at,
     }
 
 
-def test_smtp_connection(email: str, password: str, provider: str) -> bool:
+async def test_smtp_connection(email: str, password: str, provider: str) -> bool:
     """Test SMTP connection for the mailbox."""
-    import smtplib
-
-    smtp_servers = {
-        "google": ("smtp.gmail.com", 587),
-        "microsoft": ("smtp.office365.com", 587),
-    }
-
-    server, port = smtp_servers.get(provider, smtp_servers["google"])
+    server, port = SMTP_SERVERS.get(provider, SMTP_SERVERS["google"])
 
     try:
-        with smtplib.SMTP(server, port) as smtp:
-            smtp.starttls()
-            smtp.login(email, password)
+        async with aiosmtplib.SMTP(hostname=server, port=port, start_tls=True) as smtp:
+            await smtp.login(email, password)
             return True
     except Exception as e:
         print(f"SMTP test failed: {e}")
         return False
 
 
-def create_mailbox(
+async def test_smtp_connections(mailboxes: List[Dict], provider: str) -> List[bool]:
+    """
+    Test SMTP logins for many mailboxes concurrently.
+
+    Each login needs its own authenticated connection, so the win comes
+    from overlapping the TLS handshakes rather than reusing one.
+    """
+    semaphore = asyncio.Semaphore(SMTP_TEST_CONCURRENCY)
+
+    async def test_one(mailbox: Dict) -> bool:
+        async with semaphore:
+            return await test_smtp_connection(mailbox["email"], mailbox["password"], provider)
+
+    return await asyncio.gather(*(test_one(mailbox) for mailbox in mailboxes))
+
+
+async def create_mailbox_async(
     domain: str,
     first_name: str,
     last_name: str,
     provider: str = "google",
     password: Optional[str] = None,
     pattern: str = "first.last",
+    session: Optional[aiohttp.ClientSession] = None,
 ) -> Dict:
     """
     Main function to create a mailbox.
@@ -115,28 +172,36 @@ def create_mailbox(
         provider: "google" or "microsoft"
         password: Optional password (auto-generated if not provided)
         pattern: Email pattern to use
+        session: HTTP session to reuse for provider API calls
 
     Returns:
         Mailbox credentials and status
     """
+    if session is None:
+        async with aiohttp.ClientSession() as session:
+            return await create_mailbox_async(
+                domain, first_name, last_name, provider, password, pattern, session
+            )
+
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
     # Load config
-    config_path = GOOGLE_CONFIG if provider == "google" else MICROSOFT_CONFIG
-    if not config_path.exists():
-        raise FileNotFoundError(f"Config not found: {config_path}")
-    with open(config_path) as f:
-        config = json.load(f)
+    config = _load_provider_config(provider)
 
     # Generate credentials
+    created_at = datetime.now().isoformat()
     email = create_email_address(first_name, last_name, domain, pattern)
     password = password or generate_password()
 
     # Create mailbox
     if provider == "google":
-        result = create_google_mailbox(email, first_name, last_name, password, config)
+        result = await create_google_mailbox(
+            email, first_name, last_name, password, config, session, created_at
+        )
     else:
-        result = create_microsoft_mailbox(email, first_name, last_name, password, config)
+        result = await create_microsoft_mailbox(
+            email, first_name, last_name, password, config, session, created_at
+        )
 
     # Add credentials to result
     result["password"] = password
@@ -157,23 +222,82 @@ def create_mailbox(
     return result
 
 
-def bulk_create_from_csv(csv_path: str, provider: str = "google") -> List[Dict]:
-    """Create multiple mailboxes from CSV file."""
+def create_mailbox(
+    domain: str,
+    first_name: str,
+    last_name: str,
+    provider: str = "google",
+    password: Optional[str] = None,
+    pattern: str = "first.last",
+) -> Dict:
+    """Create a single mailbox (sync wrapper around create_mailbox_async)."""
+    return asyncio.run(create_mailbox_async(
+        domain=domain,
+        first_name=first_name,
+        last_name=last_name,
+        provider=provider,
+        password=password,
+        pattern=pattern,
+    ))
+
+
+async def _bulk_create(rows: List[Dict], provider: str, test_smtp: bool) -> List[Dict]:
+    """Create mailboxes for all rows concurrently over one HTTP session."""
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+    async with aiohttp.ClientSession() as session:
+        async def create_row(row: Dict) -> Dict:
+            # One bad row must not hide what the other rows created
+            failed = {
+                "domain": row.get("domain"),
+                "first_name": row.get("first_name"),
+                "last_name": row.get("last_name"),
+                "provider": provider,
+                "status": "error",
+            }
+            missing = [column for column in BULK_COLUMNS if row.get(column) is None]
+            if missing:
+                return {**failed, "error": f"Missing CSV column: {', '.join(missing)}"}
+
+            async with semaphore:
+                try:
+                    return await create_mailbox_async(
+                        domain=row["domain"],
+                        first_name=row["first_name"],
+                        last_name=row["last_name"],
+                        provider=provider,
+                        session=session,
+                    )
+                except Exception as e:
+                    return {**failed, "error": str(e)}
+
+        results = await asyncio.gather(*(create_row(row) for row in rows))
+
+    if test_smtp:
+        created = [result for result in results if result["status"] == "success"]
+        for result, ok in zip(created, await test_smtp_connections(created, provider)):
+            result["smtp_ok"] = ok
+
+    return results
+
+
+def bulk_create_from_csv(
+    csv_path: str,
+    provider: str = "google",
+    test_smtp: bool = False,
+) -> List[Dict]:
+    """
+    Create multiple mailboxes from CSV file, optionally testing SMTP logins.
+
+    Rows that fail come back as {"status": "error", "error": ...} entries
+    instead of aborting the batch.
+    """
     import csv
 
-    results = []
     with open(csv_path) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            result = create_mailbox(
-                domain=row["domain"],
-                first_name=row["first_name"],
-                last_name=row["last_name"],
-                provider=provider,
-            )
-            results.append(result)
+        rows = list(csv.DictReader(f))
 
-    return results
+    return list(asyncio.run(_bulk_create(rows, provider, test_smtp)))
 
 
 def main():
@@ -184,12 +308,19 @@ def main():
     parser.add_argument("--provider", default="google", choices=["google", "microsoft"])
     parser.add_argument("--csv", help="CSV file for bulk creation")
     parser.add_argument("--pattern", default="first.last", help="Email pattern")
+    parser.add_argument("--test-smtp", action="store_true", help="Test SMTP login after bulk creation")
 
     args = parser.parse_args()
 
     if args.csv:
-        results = bulk_create_from_csv(args.csv, args.provider)
-        print(f"\nCreated {len(results)} mailboxes")
+        results = bulk_create_from_csv(args.csv, args.provider, args.test_smtp)
+        created = [r for r in results if r["status"] == "success"]
+        print(f"\nCreated {len(created)}/{len(results)} mailboxes")
+        for r in results:
+            if r["status"] == "error":
+                print(f"  Failed: {r['first_name']} {r['last_name']} @ {r['domain']}: {r['error']}")
+        if args.test_smtp:
+            print(f"SMTP OK: {sum(r['smtp_ok'] for r in created)}/{len(created)}")
     else:
         if not all([args.domain, args.first, args.last]):
             parser.error("--domain, --first, and --last are required")
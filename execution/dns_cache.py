@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+DNS Cache
+Process-local TTL cache for DNS answers shared by the execution scripts.
+
+Usage:
+    from dns_cache import cached_resolve
+
+    answer = await cached_resolve("acmeleads.com", "MX", resolver.resolve)
+"""
+
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import dns.asyncresolver
+import dns.rdatatype
+import dns.resolver
+
+# Configuration
+DEFAULT_TTL = 900  # Used when the answer carries no RRset TTL (e.g. ANY)
+MAX_TTL = 3600  # Answers are never kept past their own TTL, only cut shorter
+MAX_ENTRIES = 1024
+
+Resolve = Callable[..., Awaitable[dns.resolver.Answer]]
+
+# Keyed by (name, type, resolver, kwargs): answers from different resolvers
+# or query options never stand in for each other
+_CACHE: Dict[Tuple, Tuple[float, dns.resolver.Answer]] = {}
+
+
+def _answer_ttl(answer: dns.resolver.Answer) -> int:
+    """Get the cache lifetime for an answer, capped at MAX_TTL."""
+    if answer.rrset is not None:
+        ttl = answer.rrset.ttl
+    elif answer.response.answer:
+        ttl = min(rrset.ttl for rrset in answer.response.answer)
+    else:
+        ttl = DEFAULT_TTL
+    return min(ttl, MAX_TTL)
+
+
+async def cached_resolve(
+    name: str,
+    rtype,
+    resolve: Optional[Resolve] = None,
+    resolver_key: Optional[Hashable] = None,
+    cache_if: Optional[Callable[[dns.resolver.Answer], bool]] = None,
+    **kwargs,
+) -> dns.resolver.Answer:
+    """
+    Resolve a DNS query, reusing a cached answer until its TTL expires.
+
+    Args:
+        name: Query name
+        rtype: Record type ("TXT", "MX", ... or a dns.rdatatype value)
+        resolve: Coroutine function doing the actual lookup
+            (defaults to dns.asyncresolver.resolve)
+        resolver_key: Identifies the resolver configuration behind resolve,
+            so equally configured resolvers share entries (defaults to resolve)
+        cache_if: Only cache answers this accepts, so a caller polling for
+            a record to appear never gets a stale answer without it
+        **kwargs: Passed through to resolve
+
+    Returns:
+        The DNS answer. NXDOMAIN/NoAnswer are raised and not cached, nor
+        are empty answers returned with raise_on_no_answer=False.
+    """
+    resolve = resolve or dns.asyncresolver.resolve
+    key = (
+        name.lower().rstrip("."),
+        dns.rdatatype.to_text(dns.rdatatype.RdataType.make(rtype)),
+        resolve if resolver_key is None else resolver_key,
+        tuple(sorted(kwargs.items())),
+    )
+
+    cached = _CACHE.pop(key, None)
+    if cached and cached[0] > time.monotonic():
+        _CACHE[key] = cached  # Re-insert as most recently used
+        return cached[1]
+
+    answer = await resolve(name, rtype, **kwargs)
+    if answer.rrset is None and not answer.response.answer:
+        return answer
+    if cache_if is not None and not cache_if(answer):
+        return answer
+
+    _CACHE[key] = (time.monotonic() + _answer_ttl(answer), answer)
+    if len(_CACHE) > MAX_ENTRIES:
+        del _CACHE[next(iter(_CACHE))]
+
+    return answer
+
+
+def clear():
+    """Drop every cached answer."""
+    _CACHE.clear()
@@ -8,12 +8,15 @@ Usage:
 """
 
 import argparse
-import json
+import asyncio
 import os
 from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime
 
+import aiohttp
+import orjson
+
 # Configuration
 CONFIG_PATH = Path(__file__).parent.parent / "config" / "namecheap.json"
 OUTPUT_DIR = Path(__file__).parent.parent / ".tmp" / "domains"
@@ -26,11 +29,14 @@ def load_config() -> Dict:
             f"Config not found: {CONFIG_PATH}\n"
             "Create config/namecheap.json with API credentials."
         )
-    with open(CONFIG_PATH) as f:
-        return json.load(f)
+    return orjson.loads(CONFIG_PATH.read_bytes())
 
 
-def check_availability(domain: str, config: Dict) -> Dict:
+async def check_availability(
+    domain: str,
+    session: aiohttp.ClientSession,
+    config: Dict,
+) -> Dict:
     """Check if domain is available."""
     # TODO: Implement Namecheap API call
     # https://www.namecheap.com/support/api/methods/domains/check.aspx
@@ -42,6 +48,30 @@ def check_availability(domain: str, config: Dict) -> Dict:
     }
 
 
+async def _find_available(domains: List[str], config: Dict, quantity: int) -> List[Dict]:
+    """Check domains concurrently; return the first `quantity` available in TLD order."""
+    available = []
+    async with aiohttp.ClientSession() as session:
+        tasks = [
+            asyncio.ensure_future(check_availability(domain, session, config))
+            for domain in domains
+        ]
+        try:
+            # All checks run at once, but results are taken in TLD preference
+            # order: a pick is final only once every preferred domain is known
+            for task in tasks:
+                result = await task
+                if result["available"]:
+                    available.append(result)
+                    if len(available) >= quantity:
+                        break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return available
+
+
 def purchase_domain(domain: str, config: Dict) -> Dict:
     """Purchase a domain via Namecheap API."""
     # TODO: Implement Namecheap API call
@@ -92,13 +122,7 @@ def purchase_domains(
     domains = generate_domain_variants(base_domain, tlds)
 
     # Check availability
-    available = []
-    for domain in domains:
-        result = check_availability(domain, config)
-        if result["available"]:
-            available.append(result)
-            if len(available) >= quantity:
-                break
+    available = asyncio.run(_find_available(domains, config, quantity))
 
     if dry_run:
         print(f"Dry run - would purchase: {[d['domain'] for d in available]}")
@@ -112,8 +136,7 @@ def purchase_domains(
 
     # Save results
     output_file = OUTPUT_DIR / f"purchase_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(output_file, "w") as f:
-        json.dump(results, f, indent=2)
+    output_file.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
 
     print(f"Results saved to: {output_file}")
     return results
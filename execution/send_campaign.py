@@ -9,33 +9,106 @@ Usage:
 
 import argparse
 import csv
-import json
+import os
 import random
+import re
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 import time
 
+import orjson
+
 # Configuration
 OUTPUT_DIR = Path(__file__).parent.parent / ".tmp" / "campaigns"
 
+# Personalization variables: {{first_name}}, {{company_name}}, ...
+_VAR_RE = re.compile(r"\{\{(\w+)\}\}")
+
+
+class _SafeDict(dict):
+    """format_map mapping that leaves unknown variables as {{name}}."""
+
+    def __missing__(self, key: str) -> str:
+        return "{{" + key + "}}"
+
+
+def _compile_template(template: str) -> str:
+    """Convert {{var}} placeholders into a str.format_map template."""
+    parts = _VAR_RE.split(template)
+    for i, part in enumerate(parts):
+        if i % 2 and not part.isdigit():
+            parts[i] = "{" + part + "}"
+        else:
+            # Literal text (numeric names would be read as positional args)
+            text = "{{" + part + "}}" if i % 2 else part
+            parts[i] = text.replace("{", "{{").replace("}", "}}")
+    return "".join(parts)
+
 
-@dataclass
+@dataclass(frozen=True)
 class EmailTemplate:
     """Email template with subject and body."""
     subject: str
     body: str
     delay_days: int = 0
 
+    def __post_init__(self):
+        # Frozen, so these compiled forms can never go stale
+        object.__setattr__(self, "_subject_fmt", _compile_template(self.subject))
+        object.__setattr__(self, "_body_fmt", _compile_template(self.body))
+        object.__setattr__(
+            self, "_variables", frozenset(_VAR_RE.findall(self.subject + "\n" + self.body))
+        )
+
+    @property
+    def variables(self) -> frozenset:
+        """Names of the {{variables}} used in the subject and body."""
+        return self._variables
+
+    def render(self, mapping: Dict) -> Tuple[str, str]:
+        """Render subject and body for one lead's variables."""
+        values = _SafeDict(mapping)
+        return self._subject_fmt.format_map(values), self._body_fmt.format_map(values)
+
+    def render_many(self, mappings: Iterable[Dict]) -> List[Tuple[str, str]]:
+        """Render subject and body for many leads' variables."""
+        subject = self._subject_fmt.format_map
+        body = self._body_fmt.format_map
+        rendered = []
+        for mapping in mappings:
+            values = _SafeDict(mapping)
+            rendered.append((subject(values), body(values)))
+        return rendered
+
+
+class _Row(Mapping):
+    """Read-only view of a CSV row, keyed through a header index shared by all rows."""
 
-@dataclass
+    __slots__ = ("_index", "_values")
+
+    def __init__(self, index: Dict[str, int], values: List[str]):
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key: str) -> Optional[str]:
+        return self._values[self._index[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+@dataclass(slots=True)
 class Lead:
     """Lead data structure."""
     email: str
     first_name: str
     company_name: str
-    extra: Dict = None
+    extra: Optional[Mapping] = None
 
 
 class Campaign:
@@ -57,6 +130,7 @@ class Campaign:
         self.status = "draft"
         self.created_at = datetime.now()
         self.leads: List[Lead] = []
+        self._saved_hash: Optional[int] = None
 
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -65,16 +139,27 @@ class Campaign:
 
     def _load_leads(self, csv_path: str):
         """Load leads from CSV file."""
-        with open(csv_path) as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                lead = Lead(
-                    email=row.get("email", ""),
-                    first_name=row.get("first_name", ""),
-                    company_name=row.get("company_name", ""),
-                    extra=row,
-                )
-                self.leads.append(lead)
+        with open(csv_path, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            width = len(header)
+            index = {name: i for i, name in enumerate(header)}
+            # Columns missing from the header point at the "" appended to each row
+            email_i, first_i, company_i = (
+                index.get(name, width) for name in ("email", "first_name", "company_name")
+            )
+            leads = self.leads
+            for values in reader:
+                if not values:
+                    continue
+                if len(values) != width:
+                    # Short rows read as None and extra cells are dropped, like csv.DictReader
+                    del values[width:]
+                    values.extend([None] * (width - len(values)))
+                values.append("")
+                leads.append(Lead(
+                    values[email_i], values[first_i], values[company_i], _Row(index, values)
+                ))
         print(f"Loaded {len(self.leads)} leads")
 
     def add_email(self, subject: str, body: str, delay_days: int = 0):
@@ -87,19 +172,40 @@ class Campaign:
         self.sequence.append(template)
         print(f"Added email {len(self.sequence)}: {subject[:50]}...")
 
+    @staticmethod
+    def _lead_variables(lead: Lead) -> Dict:
+        """Get the personalization variables available for a lead."""
+        return {
+            **(lead.extra or {}),
+            "first_name": lead.first_name,
+            "company_name": lead.company_name,
+            "email": lead.email,
+        }
+
     def personalize(self, template: str, lead: Lead) -> str:
-        """Replace personalization variables."""
-        result = template
-        result = result.replace("{{first_name}}", lead.first_name)
-        result = result.replace("{{company_name}}", lead.company_name)
-        result = result.replace("{{email}}", lead.email)
+        """Replace personalization variables in a single pass."""
+        mapping = self._lead_variables(lead)
+        # Unknown variables are left in place for validate() to catch
+        return _VAR_RE.sub(
+            lambda m: str(mapping[m.group(1)]) if m.group(1) in mapping else m.group(0),
+            template,
+        )
 
-        # Handle extra fields
-        if lead.extra:
-            for key, value in lead.extra.items():
-                result = result.replace(f"{{{{{key}}}}}", str(value))
+    def render(self, email: EmailTemplate, lead: Lead) -> Tuple[str, str]:
+        """Render a sequence email's subject and body for a lead."""
+        return email.render(self._lead_variables(lead))
 
-        return result
+    def personalize_many(
+        self, email: EmailTemplate, leads: Optional[List[Lead]] = None
+    ) -> List[Tuple[str, str]]:
+        """Render a sequence email for many leads (default: all loaded leads)."""
+        leads = self.leads if leads is None else leads
+
+        # Nothing to substitute: every lead gets the same strings
+        if not email.variables:
+            return [email.render({})] * len(leads)
+
+        return email.render_many(map(self._lead_variables, leads))
 
     def validate(self) -> List[str]:
         """Validate campaign before launch."""
@@ -114,13 +220,15 @@ class Campaign:
         if not self.mailboxes:
             errors.append("No mailboxes configured")
 
-        # Check for missing personalization
-        for i, email in enumerate(self.sequence):
-            for lead in self.leads[:5]:  # Check first 5
-                personalized = self.personalize(email.body, lead)
-                if "{{" in personalized:
-                    errors.append(f"Email {i+1} has unresolved variables")
-                    break
+        # Check for missing personalization (all leads share the CSV header)
+        if self.leads:
+            available = self._lead_variables(self.leads[0]).keys()
+            for i, email in enumerate(self.sequence):
+                missing = email.variables - available
+                if missing:
+                    errors.append(
+                        f"Email {i+1} has unresolved variables: {', '.join(sorted(missing))}"
+                    )
 
         return errors
 
@@ -154,7 +262,7 @@ class Campaign:
         self._save()
 
     def _save(self):
-        """Save campaign state to file."""
+        """Save campaign state to file (atomically, skipping unchanged state)."""
         state = {
             "id": self.id,
             "name": self.name,
@@ -167,14 +275,21 @@ class Campaign:
             "sequence": [asdict(e) for e in self.sequence],
         }
 
-        with open(OUTPUT_DIR / f"{self.id}.json", "w") as f:
-            json.dump(state, f, indent=2, default=str)
+        data = orjson.dumps(state, option=orjson.OPT_INDENT_2)
+        digest = hash(data)
+        if digest == self._saved_hash:
+            return
+
+        path = OUTPUT_DIR / f"{self.id}.json"
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._saved_hash = digest
 
     @classmethod
     def load(cls, campaign_id: str) -> "Campaign":
         """Load campaign from file."""
-        with open(OUTPUT_DIR / f"{campaign_id}.json") as f:
-            state = json.load(f)
+        state = orjson.loads((OUTPUT_DIR / f"{campaign_id}.json").read_bytes())
 
         campaign = cls(name=state["name"])
         campaign.id = state["id"]
@@ -227,15 +342,13 @@ def main():
 
         # Load sequence if provided
         if args.sequence:
-            with open(args.sequence) as f:
-                sequence = json.load(f)
+            sequence = orjson.loads(Path(args.sequence).read_bytes())
             for email in sequence:
                 campaign.add_email(**email)
 
         # Load mailboxes if provided
         if args.mailboxes:
-            with open(args.mailboxes) as f:
-                campaign.mailboxes = json.load(f)
+            campaign.mailboxes = orjson.loads(Path(args.mailboxes).read_bytes())
 
         campaign._save()
         print(f"Campaign created: {campaign.id}")
@@ -8,15 +8,54 @@ Usage:
 """
 
 import argparse
+import asyncio
 import json
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 
-# Configuration
-CONFIG_PATH = Path(__file__).parent.parent / "config" / "cloudflare.json"
+import httpx
 
+try:
+    from execution.dns_cache import cached_resolve
+except ImportError:  # Run as a script: python execution/setup_dns.py
+    from dns_cache import cached_resolve
 
+# Configuration
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "cloudflare.json"
+CLOUDFLARE_API = "https://api.cloudflare.com/client/v4"
+RETRY_STATUSES = (429, 500, 502, 503, 504)  # Rate limits and transient server errors
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5  # Seconds, doubled after each retry
+
+SPF_RECORDS: Mapping[str, str] = MappingProxyType({
+    "google": "v=spf1 include:_spf.google.com ~all",
+    "microsoft": "v=spf1 include:spf.protection.outlook.com ~all",
+    "sendgrid": "v=spf1 include:sendgrid.net ~all",
+})
+DEFAULT_SPF = "v=spf1 ~all"
+
+# {domain_slug} is the domain with dots replaced by dashes
+MX_RECORDS: Mapping[str, Tuple[Tuple[int, str], ...]] = MappingProxyType({
+    "google": (
+        (1, "aspmx.l.google.com"),
+        (5, "alt1.aspmx.l.google.com"),
+        (5, "alt2.aspmx.l.google.com"),
+        (10, "alt3.aspmx.l.google.com"),
+        (10, "alt4.aspmx.l.google.com"),
+    ),
+    "microsoft": (
+        (0, "{domain_slug}.mail.protection.outlook.com"),
+    ),
+})
+
+# Zone IDs never change for a domain, so each is looked up once per process
+_ZONE_IDS: Dict[str, str] = {}
+
+
+@lru_cache(maxsize=1)
 def load_config() -> Dict:
     """Load Cloudflare API credentials."""
     if not CONFIG_PATH.exists():
@@ -28,96 +67,168 @@ def load_config() -> Dict:
         return json.load(f)
 
 
-def get_zone_id(domain: str, config: Dict) -> str:
+def _client(config: Dict) -> httpx.AsyncClient:
+    """Create a pooled HTTP/2 client authenticated for the Cloudflare API."""
+    return httpx.AsyncClient(
+        base_url=CLOUDFLARE_API,
+        headers={"Authorization": f"Bearer {config['api_token']}"},
+        timeout=10,
+        # One multiplexed connection carries every record request of a run
+        # (HTTP/2 needs the httpx[http2] extra; retries cover connect errors)
+        transport=httpx.AsyncHTTPTransport(http2=True, retries=3),
+    )
+
+
+async def _request(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a Cloudflare API request, retrying rate-limited and 5xx responses."""
+    for attempt in range(MAX_RETRIES + 1):
+        response = await client.request(method, url, **kwargs)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+def _cloudflare_result(response: httpx.Response):
+    """Unwrap a Cloudflare API response, raising on API errors."""
+    try:
+        data = response.json()
+    except ValueError:  # Non-JSON body, e.g. an HTML 502 page from the edge
+        raise RuntimeError(f"Cloudflare API error: HTTP {response.status_code}")
+    if not data.get("success"):
+        errors = data.get("errors") or [{"message": f"HTTP {response.status_code}"}]
+        raise RuntimeError(f"Cloudflare API error: {errors[0].get('message')}")
+    return data["result"]
+
+
+async def get_zone_id(domain: str, client: httpx.AsyncClient) -> str:
     """Get Cloudflare zone ID for domain."""
-    # TODO: Implement Cloudflare API call
-    # GET /zones?name={domain}
+    if domain in _ZONE_IDS:
+        return _ZONE_IDS[domain]
+
     print(f"Getting zone ID for: {domain}")
-    return "placeholder_zone_id"
+    response = await _request(client, "GET", "/zones", params={"name": domain})
+    zones = _cloudflare_result(response)
+    if not zones:
+        raise RuntimeError(f"No Cloudflare zone found for {domain}")
+    _ZONE_IDS[domain] = zones[0]["id"]
+    return _ZONE_IDS[domain]
 
 
-def create_dns_record(
+async def create_dns_record(
     zone_id: str,
     record_type: str,
     name: str,
     content: str,
-    config: Dict,
+    client: httpx.AsyncClient,
     priority: int = None,
     ttl: int = 3600,
 ) -> Dict:
     """Create a DNS record via Cloudflare API."""
-    # TODO: Implement Cloudflare API call
-    # POST /zones/{zone_id}/dns_records
     print(f"Creating {record_type} record: {name} -> {content}")
-    return {
-        "type": record_type,
-        "name": name,
-        "content": content,
-        "status": "success",
-    }
+    payload = {"type": record_type, "name": name, "content": content, "ttl": ttl}
+    if priority is not None:
+        payload["priority"] = priority
 
+    result = {"type": record_type, "name": name, "content": content}
+    try:
+        response = await _request(client, "POST", f"/zones/{zone_id}/dns_records", json=payload)
+        record = _cloudflare_result(response)
+    except (httpx.HTTPError, RuntimeError) as e:
+        return {**result, "status": "error", "error": str(e)}
+    return {"id": record["id"], **result, "status": "success"}
 
-def configure_spf(domain: str, zone_id: str, provider: str, config: Dict) -> Dict:
-    """Configure SPF record."""
-    spf_records = {
-        "google": "v=spf1 include:_spf.google.com ~all",
-        "microsoft": "v=spf1 include:spf.protection.outlook.com ~all",
-        "sendgrid": "v=spf1 include:sendgrid.net ~all",
-    }
 
-    content = spf_records.get(provider, "v=spf1 ~all")
-    return create_dns_record(zone_id, "TXT", domain, content, config)
+async def configure_spf(
+    domain: str, zone_id: str, provider: str, client: httpx.AsyncClient
+) -> Dict:
+    """Configure SPF record."""
+    content = SPF_RECORDS.get(provider, DEFAULT_SPF)
+    return await create_dns_record(zone_id, "TXT", domain, content, client)
 
 
-def configure_dkim(
+async def configure_dkim(
     domain: str,
     zone_id: str,
     provider: str,
     selector: str,
-    config: Dict,
+    client: httpx.AsyncClient,
+    dkim_value: Optional[str] = None,
 ) -> Dict:
     """Configure DKIM record."""
     # For Google Workspace, DKIM key is generated in admin console
     name = f"{selector}._domainkey.{domain}"
-    content = "DKIM_KEY_PLACEHOLDER"  # Get from provider
-    return create_dns_record(zone_id, "TXT", name, content, config)
+    if not dkim_value:
+        # A dummy value would clash with the real key once it is published
+        return {
+            "type": "TXT", "name": name, "content": None, "status": "skipped",
+            "error": "No DKIM key given; get it from the provider and pass dkim_value",
+        }
+    return await create_dns_record(zone_id, "TXT", name, dkim_value, client)
+
+
+@lru_cache(maxsize=256)
+def _dmarc_record(policy: str, rua_email: str) -> str:
+    """Build a DMARC TXT record value."""
+    return f"v=DMARC1; p={policy}; rua=mailto:{rua_email}"
 
 
-def configure_dmarc(
+async def configure_dmarc(
     domain: str,
     zone_id: str,
     policy: str,
     rua_email: str,
-    config: Dict,
+    client: httpx.AsyncClient,
 ) -> Dict:
     """Configure DMARC record."""
     name = f"_dmarc.{domain}"
-    content = f"v=DMARC1; p={policy}; rua=mailto:{rua_email}"
-    return create_dns_record(zone_id, "TXT", name, content, config)
+    return await create_dns_record(zone_id, "TXT", name, _dmarc_record(policy, rua_email), client)
 
 
-def configure_mx(domain: str, zone_id: str, provider: str, config: Dict) -> List[Dict]:
+async def configure_mx(
+    domain: str, zone_id: str, provider: str, client: httpx.AsyncClient
+) -> List[Dict]:
     """Configure MX records."""
-    mx_records = {
-        "google": [
-            (1, "aspmx.l.google.com"),
-            (5, "alt1.aspmx.l.google.com"),
-            (5, "alt2.aspmx.l.google.com"),
-            (10, "alt3.aspmx.l.google.com"),
-            (10, "alt4.aspmx.l.google.com"),
-        ],
-        "microsoft": [
-            (0, f"{domain.replace('.', '-')}.mail.protection.outlook.com"),
-        ],
-    }
+    domain_slug = domain.replace(".", "-")
+    return list(await asyncio.gather(*(
+        create_dns_record(
+            zone_id, "MX", domain, server.format(domain_slug=domain_slug), client,
+            priority=priority,
+        )
+        for priority, server in MX_RECORDS.get(provider, ())
+    )))
+
 
-    results = []
-    for priority, server in mx_records.get(provider, []):
-        result = create_dns_record(
-            zone_id, "MX", domain, server, config, priority=priority
+async def _configure_async(
+    domain: str,
+    email_provider: str,
+    enable_dmarc: bool,
+    dmarc_policy: str,
+    dkim_selector: str,
+    dkim_value: Optional[str],
+) -> Dict:
+    """Create all records concurrently over one Cloudflare client."""
+    config = load_config()
+
+    async with _client(config) as client:
+        zone_id = await get_zone_id(domain, client)
+
+        # Records have no dependencies on each other, so create them all at once
+        spf, mx, dkim, *dmarc = await asyncio.gather(
+            configure_spf(domain, zone_id, email_provider, client),
+            configure_mx(domain, zone_id, email_provider, client),
+            configure_dkim(
+                domain, zone_id, email_provider, dkim_selector, client, dkim_value
+            ),
+            *([configure_dmarc(
+                domain, zone_id, dmarc_policy, f"dmarc@{domain}", client
+            )] if enable_dmarc else []),
         )
-        results.append(result)
-    return results
+
+    return {
+        "domain": domain,
+        "provider": email_provider,
+        "records": [spf, *mx, dkim, *dmarc],
+    }
 
 
 def configure_dns(
@@ -126,6 +237,7 @@ def configure_dns(
     enable_dmarc: bool = True,
     dmarc_policy: str = "none",
     dkim_selector: str = "google",
+    dkim_value: Optional[str] = None,
 ) -> Dict:
     """
     Main function to configure all DNS records for email.
@@ -136,69 +248,48 @@ def configure_dns(
         enable_dmarc: Whether to set up DMARC
         dmarc_policy: DMARC policy (none, quarantine, reject)
         dkim_selector: DKIM selector name
+        dkim_value: DKIM TXT value from the provider (record skipped if None)
 
     Returns:
         Configuration results
     """
-    config = load_config()
-    zone_id = get_zone_id(domain, config)
+    return asyncio.run(_configure_async(
+        domain, email_provider, enable_dmarc, dmarc_policy, dkim_selector, dkim_value
+    ))
+
+
+def _txt_contains(answer, marker: bytes) -> bool:
+    """Check whether any TXT record in a lookup result contains marker."""
+    if isinstance(answer, Exception):
+        return False
+    return any(marker in b"".join(rdata.strings) for rdata in answer)
+
+
+async def _verify_async(domain: str) -> Dict:
+    """Run the SPF/MX/DMARC lookups concurrently, reusing unexpired answers."""
+    # The default system resolver is shared, so its cache entries outlive a call.
+    # Only answers that already hold the record are cached: a TXT answer
+    # without it (e.g. just a site-verification token) is re-queried while
+    # the new record propagates.
+    txt, mx, dmarc = await asyncio.gather(
+        cached_resolve(domain, "TXT", cache_if=lambda a: _txt_contains(a, b"spf1")),
+        cached_resolve(domain, "MX"),
+        cached_resolve(
+            f"_dmarc.{domain}", "TXT", cache_if=lambda a: _txt_contains(a, b"DMARC1")
+        ),
+        return_exceptions=True,  # NXDOMAIN/NoAnswer just mean "not configured"
+    )
 
-    results = {
-        "domain": domain,
-        "provider": email_provider,
-        "records": [],
+    return {
+        "spf": _txt_contains(txt, b"spf1"),
+        "mx": not isinstance(mx, Exception) and len(mx) > 0,
+        "dmarc": _txt_contains(dmarc, b"DMARC1"),
     }
 
-    # SPF
-    spf = configure_spf(domain, zone_id, email_provider, config)
-    results["records"].append(spf)
-
-    # MX
-    mx = configure_mx(domain, zone_id, email_provider, config)
-    results["records"].extend(mx)
-
-    # DKIM
-    dkim = configure_dkim(domain, zone_id, email_provider, dkim_selector, config)
-    results["records"].append(dkim)
-
-    # DMARC
-    if enable_dmarc:
-        dmarc = configure_dmarc(
-            domain, zone_id, dmarc_policy, f"dmarc@{domain}", config
-        )
-        results["records"].append(dmarc)
-
-    return results
-
 
 def verify_dns(domain: str) -> Dict:
     """Verify DNS records are properly configured."""
-    import subprocess
-
-    checks = {}
-
-    # Check SPF
-    result = subprocess.run(
-        ["dig", "+short", "TXT", domain],
-        capture_output=True, text=True
-    )
-    checks["spf"] = "spf1" in result.stdout
-
-    # Check MX
-    result = subprocess.run(
-        ["dig", "+short", "MX", domain],
-        capture_output=True, text=True
-    )
-    checks["mx"] = len(result.stdout.strip()) > 0
-
-    # Check DMARC
-    result = subprocess.run(
-        ["dig", "+short", "TXT", f"_dmarc.{domain}"],
-        capture_output=True, text=True
-    )
-    checks["dmarc"] = "DMARC1" in result.stdout
-
-    return checks
+    return asyncio.run(_verify_async(domain))
 
 
 def main():
@@ -207,6 +298,8 @@ def main():
     parser.add_argument("--provider", default="google", help="Email provider")
     parser.add_argument("--no-dmarc", action="store_true", help="Skip DMARC setup")
     parser.add_argument("--dmarc-policy", default="none", help="DMARC policy")
+    parser.add_argument("--dkim-selector", default="google", help="DKIM selector")
+    parser.add_argument("--dkim-value", help="DKIM TXT value from the provider (skipped if omitted)")
     parser.add_argument("--verify", action="store_true", help="Verify existing DNS")
 
     args = parser.parse_args()
@@ -223,11 +316,18 @@ def main():
         email_provider=args.provider,
         enable_dmarc=not args.no_dmarc,
         dmarc_policy=args.dmarc_policy,
+        dkim_selector=args.dkim_selector,
+        dkim_value=args.dkim_value,
     )
 
     print(f"\nDNS Configuration for {args.domain}:")
     print(f"Provider: {results['provider']}")
-    print(f"Records created: {len(results['records'])}")
+    created = [r for r in results["records"] if r["status"] == "success"]
+    print(f"Records created: {len(created)}")
+    for record in results["records"]:
+        if record["status"] != "success":
+            mark = "-" if record["status"] == "skipped" else "✗"
+            print(f"  {mark} {record['type']} {record['name']}: {record['error']}")
 
 
 if __name__ == "__main__":
@@ -5,20 +5,46 @@ Manages email warmup process for new sending accounts.
 
 Usage:
     python execution/warmup_account.py --email john@acmeleads.com --days 14
+    python execution/warmup_account.py --action fleet
 """
 
 import argparse
-import json
+import sqlite3
+from contextlib import closing
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
+
+import orjson
 
 # Configuration
 OUTPUT_DIR = Path(__file__).parent.parent / ".tmp" / "warmup"
+DB_NAME = "warmup.sqlite"
+
+# One row per email. The full config is kept as JSON; the fields read or
+# bumped on every call get their own columns so status and metric updates
+# never parse or rewrite it. WITHOUT ROWID clusters the rows by email.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS warmup (
+    email TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    config TEXT NOT NULL,
+    total_sent INTEGER NOT NULL DEFAULT 0,
+    total_received INTEGER NOT NULL DEFAULT 0,
+    inbox_rate REAL NOT NULL DEFAULT 0.0,
+    spam_rate REAL NOT NULL DEFAULT 0.0
+) WITHOUT ROWID
+"""
+_STATUS_COLUMNS = (
+    "email, status, start_date, end_date,"
+    " total_sent, total_received, inbox_rate, spam_rate"
+)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class WarmupSchedule:
     """Warmup schedule configuration."""
     day: int
@@ -39,13 +65,66 @@ DEFAULT_SCHEDULE = [
     WarmupSchedule(day=21, daily_limit=40, reply_rate=0.3),
 ]
 
+# Plain-dict form of DEFAULT_SCHEDULE for configs, built once instead of asdict() per call
+_SCHEDULE_DICTS = tuple(
+    {"day": s.day, "daily_limit": s.daily_limit, "reply_rate": s.reply_rate}
+    for s in DEFAULT_SCHEDULE
+)
+
+
+def _index_schedule_by_day(schedule: List[WarmupSchedule]) -> Tuple[WarmupSchedule, ...]:
+    """Expand a day-sorted schedule into one entry per day, filled forward."""
+    by_day = [schedule[0]] * (schedule[-1].day + 1)
+    for entry in schedule:
+        by_day[entry.day:] = [entry] * (len(by_day) - entry.day)
+    return tuple(by_day)
+
+
+_SCHEDULE_BY_DAY = _index_schedule_by_day(DEFAULT_SCHEDULE)
+
 
 def get_schedule_for_day(day: int) -> WarmupSchedule:
     """Get warmup parameters for a specific day."""
-    for schedule in reversed(DEFAULT_SCHEDULE):
-        if day >= schedule.day:
-            return schedule
-    return DEFAULT_SCHEDULE[0]
+    return _SCHEDULE_BY_DAY[max(0, min(day, len(_SCHEDULE_BY_DAY) - 1))]
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the warmup database, creating it if missing."""
+    # Checked on every call: .tmp/ is cleaned out from under running processes
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(OUTPUT_DIR / DB_NAME)
+    # WAL persists in the file: commits append to the log instead of
+    # rewriting pages through a rollback journal
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # Still atomic under WAL; fsync at checkpoints
+    conn.execute(_SCHEMA)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _status_from_row(row: sqlite3.Row, now: datetime) -> Dict:
+    """Build a check_status result from a warmup table row."""
+    # Calculate current day
+    start_date = datetime.fromisoformat(row["start_date"])
+    current_day = (now - start_date).days + 1
+
+    # Get today's schedule
+    schedule = get_schedule_for_day(current_day)
+
+    return {
+        "email": row["email"],
+        "status": row["status"],
+        "day": current_day,
+        "daily_limit": schedule.daily_limit,
+        "expected_reply_rate": schedule.reply_rate,
+        "metrics": {
+            "total_sent": row["total_sent"],
+            "total_received": row["total_received"],
+            "inbox_rate": row["inbox_rate"],
+            "spam_rate": row["spam_rate"],
+        },
+        "end_date": row["end_date"],
+    }
 
 
 def register_with_warmup_network(email: str, password: str, pool: str) -> Dict:
@@ -97,7 +176,7 @@ def start_warmup(
         "start_date": start_date.isoformat(),
         "end_date": end_date.isoformat(),
         "current_day": 1,
-        "schedule": [asdict(s) for s in DEFAULT_SCHEDULE[:duration_days]],
+        "schedule": [dict(s) for s in _SCHEDULE_DICTS[:duration_days]],
         "metrics": {
             "total_sent": 0,
             "total_received": 0,
@@ -106,100 +185,106 @@ def start_warmup(
         },
     }
 
-    # Save config
-    config_file = OUTPUT_DIR / f"{email.replace('@', '_at_')}_warmup.json"
-    with open(config_file, "w") as f:
-        json.dump(warmup_config, f, indent=2)
+    # Save config (restarting an email resets its metrics)
+    config = {k: v for k, v in warmup_config.items() if k != "metrics"}
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO warmup (email, status, start_date, end_date, config)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (email, "active", config["start_date"], config["end_date"], orjson.dumps(config).decode()),
+        )
 
     print(f"Warmup started for {email}")
     print(f"Duration: {duration_days} days")
-    print(f"Config saved: {config_file}")
+    print(f"Config saved: {OUTPUT_DIR / DB_NAME}")
 
     return warmup_config
 
 
 def check_status(email: str) -> Dict:
     """Check warmup status for an email."""
-    config_file = OUTPUT_DIR / f"{email.replace('@', '_at_')}_warmup.json"
+    with closing(_connect()) as conn:
+        row = conn.execute(f"SELECT {_STATUS_COLUMNS} FROM warmup WHERE email = ?", (email,)).fetchone()
 
-    if not config_file.exists():
+    if row is None:
         return {"email": email, "status": "not_found"}
 
-    with open(config_file) as f:
-        config = json.load(f)
+    return _status_from_row(row, datetime.now())
 
-    # Calculate current day
-    start_date = datetime.fromisoformat(config["start_date"])
-    current_day = (datetime.now() - start_date).days + 1
 
-    # Get today's schedule
-    schedule = get_schedule_for_day(current_day)
+def fleet_status() -> List[Dict]:
+    """Check warmup status for every email in one query."""
+    with closing(_connect()) as conn:
+        rows = conn.execute(f"SELECT {_STATUS_COLUMNS} FROM warmup ORDER BY email").fetchall()
 
-    return {
-        "email": email,
-        "status": config["status"],
-        "day": current_day,
-        "daily_limit": schedule.daily_limit,
-        "expected_reply_rate": schedule.reply_rate,
-        "metrics": config["metrics"],
-        "end_date": config["end_date"],
-    }
+    now = datetime.now()
+    return [_status_from_row(row, now) for row in rows]
 
 
 def update_metrics(email: str, sent: int, received: int, inbox: int, spam: int) -> Dict:
-    """Update warmup metrics."""
-    config_file = OUTPUT_DIR / f"{email.replace('@', '_at_')}_warmup.json"
-
-    if not config_file.exists():
-        raise FileNotFoundError(f"No warmup config for {email}")
-
-    with open(config_file) as f:
-        config = json.load(f)
-
-    config["metrics"]["total_sent"] += sent
-    config["metrics"]["total_received"] += received
-
+    """Add a day's warmup counts to the email's running metrics."""
+    # Placement rates come from the latest update that measured any
     total = inbox + spam
-    if total > 0:
-        config["metrics"]["inbox_rate"] = inbox / total
-        config["metrics"]["spam_rate"] = spam / total
+    inbox_rate = inbox / total if total > 0 else None
+    spam_rate = spam / total if total > 0 else None
+
+    with closing(_connect()) as conn, conn:
+        cursor = conn.execute(
+            "UPDATE warmup SET"
+            " total_sent = total_sent + ?,"
+            " total_received = total_received + ?,"
+            " inbox_rate = COALESCE(?, inbox_rate),"
+            " spam_rate = COALESCE(?, spam_rate)"
+            " WHERE email = ?",
+            (sent, received, inbox_rate, spam_rate, email),
+        )
+        if cursor.rowcount == 0:
+            raise FileNotFoundError(f"No warmup config for {email}")
 
-    with open(config_file, "w") as f:
-        json.dump(config, f, indent=2)
+        row = conn.execute(
+            "SELECT total_sent, total_received, inbox_rate, spam_rate FROM warmup WHERE email = ?",
+            (email,),
+        ).fetchone()
 
-    return config["metrics"]
+    return dict(row)
 
 
 def stop_warmup(email: str) -> Dict:
     """Stop warmup for an email."""
-    config_file = OUTPUT_DIR / f"{email.replace('@', '_at_')}_warmup.json"
+    with closing(_connect()) as conn, conn:
+        cursor = conn.execute(
+            "UPDATE warmup SET status = 'stopped',"
+            " config = json_set(config, '$.status', 'stopped', '$.stopped_at', ?)"
+            " WHERE email = ?",
+            (datetime.now().isoformat(), email),
+        )
 
-    if not config_file.exists():
+    if cursor.rowcount == 0:
         return {"email": email, "status": "not_found"}
 
-    with open(config_file) as f:
-        config = json.load(f)
-
-    config["status"] = "stopped"
-    config["stopped_at"] = datetime.now().isoformat()
-
-    with open(config_file, "w") as f:
-        json.dump(config, f, indent=2)
-
     return {"email": email, "status": "stopped"}
 
 
 def main():
     parser = argparse.ArgumentParser(description="Email warmup management")
-    parser.add_argument("--email", required=True, help="Email to warm up")
-    parser.add_argument("--action", default="start", choices=["start", "status", "stop"])
+    parser.add_argument("--email", help="Email to warm up")
+    parser.add_argument("--action", default="start", choices=["start", "status", "stop", "fleet"])
     parser.add_argument("--daily-limit", type=int, default=40, help="Max emails per day")
     parser.add_argument("--days", type=int, default=14, help="Warmup duration")
     parser.add_argument("--pool", default="general", help="Warmup pool")
 
     args = parser.parse_args()
 
-    if args.action == "start":
+    if args.action != "fleet" and not args.email:
+        parser.error("--email is required")
+
+    if args.action == "fleet":
+        for result in fleet_status():
+            print(
+                f"{result['email']}: {result['status']}, day {result['day']},"
+                f" inbox {result['metrics']['inbox_rate']:.1%}"
+            )
+    elif args.action == "start":
         result = start_warmup(
             email=args.email,
             warmup_pool=args.pool,